@@ -1,20 +1,27 @@
 #!/usr/bin/env python
 
+# Keep module-level imports to the stdlib: pandas, yaml, redis and the core modules are imported
+# inside the subcommands that need them, so stop_* and warm-daemon submissions start instantly.
 import argparse
-import yaml
 import sys
 import logging
 import importlib
-from core.arch_manager import ArchManager
-from core.arch_client import ArchClient
 import os
 import signal
 from datetime import datetime
-import pandas as pd
 import time
-import core.replay_helper as replay_helper 
+import traceback
+
+# Anchored at the framework dir so --warm finds the daemon from any working directory
+ARCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WARM_SOCKET = os.path.join(ARCH_DIR, 'pids', 'arch_warm.sock')
+
+def warm_pid_file(socket_path):
+    # One PID file per socket, so several daemons can run and be stopped independently
+    return f"{os.path.splitext(socket_path)[0]}.pid"
 
 def load_config(file_path):
+    import yaml
     with open(file_path, 'r') as f:
         return yaml.safe_load(f)
 
@@ -35,17 +42,20 @@ def setup_logging(config, mode, is_server=False, client_dir=None, config_name=No
             # client_<myclientname>_live_<configname>_<date>.log
             log_file = f"{log_dir}/client_{client_name}_live_{config_name}_{current_date}.log"
         else:  # replay
+            import pandas as pd
             start_date = pd.to_datetime(config['historical_range']['start']).strftime('%Y%m%d')
             end_date = pd.to_datetime(config['historical_range']['end']).strftime('%Y%m%d')
             log_file = f"{log_dir}/client_{client_name}_replay_{config_name}_{start_date}_{end_date}_{mode_str}_{run_timestamp}.log"
 
-    logging.basicConfig(
-        level=logging.INFO,  # Change to logging.DEBUG for more details
-        format='%(asctime)s - %(levelname)s - %(processName)s - %(message)s',
-        handlers=[
+    from core.log_helper import install_handlers
+    # log_mode: queue moves handler I/O to a listener thread (see core/log_helper.py for all log_* keys)
+    install_handlers(
+        config,
+        [
             logging.FileHandler(log_file),
             logging.StreamHandler()
-        ]
+        ],
+        level=logging.INFO  # Change to logging.DEBUG for more details
     )
     return log_dir  # Return log_dir for use in subjob logs
 
@@ -54,6 +64,19 @@ def write_pid(pid_file):
     with open(pid_file, 'w') as f:
         f.write(str(os.getpid()))
 
+def process_alive(pid_file):
+    if not os.path.exists(pid_file):
+        return False
+    with open(pid_file, 'r') as f:
+        pid = int(f.read().strip())
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists but owned by another user
+
 def stop_process(pid_file):
     if not os.path.exists(pid_file):
         print(f"No process found for {pid_file}")
@@ -70,7 +93,32 @@ def stop_process(pid_file):
     except Exception as e:
         print(f"Error stopping process: {e}")
 
-def main():
+def run_warm_job(job):
+    """Run a submitted CLI job inside a forked warm-daemon child; returns its exit status."""
+    os.chdir(job['cwd'])
+    root = logging.getLogger()
+    for handler in root.handlers[:]:  # Drop the daemon's handlers; the job sets up its own logging
+        root.removeHandler(handler)
+    try:
+        main(job['argv'])
+        return 0
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        # Printed as well as logged: the job may have failed before its own log handlers existed
+        traceback.print_exc()
+        logging.exception(f"Warm job {job['argv']} failed")
+        return 1
+    finally:
+        # The daemon child leaves through os._exit, which skips exit hooks: drain queued records and flush now
+        from core.log_helper import stop_queue_logging
+        stop_queue_logging()
+        logging.shutdown()
+
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Arch Framework CLI")
     subparsers = parser.add_subparsers(dest='command', required=True)
 
@@ -87,6 +135,34 @@ def main():
     client_parser.add_argument('--parallel', action='store_true', help="Run replay in parallel mode (default: sequential)")
     client_parser.add_argument('--num_processes', '-n', type=int, default=4, help="Number of parallel processes (default: 4, max: 20)")
     client_parser.add_argument('--timeout', type=int, default=30, help="Timeout per subjob in minutes (default: 30)")
+    client_parser.add_argument('--distributed', action='store_true', help="Run replay as coordinator; period chunks are queued in Redis for 'replay_worker' processes")
+    client_parser.add_argument('--chunk_size', type=int, default=20, help="Periods per distributed work item (default: 20)")
+    client_parser.add_argument('--warm', action='store_true', help="Submit the replay to a running warm daemon (see start_daemon)")
+    client_parser.add_argument('--socket', type=os.path.abspath, default=WARM_SOCKET, help=f"Warm daemon socket used with --warm (default: {WARM_SOCKET})")
+
+    # replay_worker subcommand (any number, on any host sharing the Redis and file paths)
+    worker_parser = subparsers.add_parser('replay_worker')
+    worker_parser.add_argument('--redis_host', default='localhost', help="Redis host of the coordinator (default: localhost)")
+    worker_parser.add_argument('--redis_port', type=int, default=6379, help="Redis port (default: 6379)")
+    worker_parser.add_argument('--redis_db', type=int, default=0, help="Redis db (default: 0)")
+    worker_parser.add_argument('--idle_timeout', type=int, default=0, help="Exit after this many idle seconds (default: 0, never)")
+
+    # sweep subcommand (replay one client over a parameter grid, sharing loaded data)
+    sweep_parser = subparsers.add_parser('sweep')
+    sweep_parser.add_argument('client_script', help="Client script file (e.g., clients/client1.py)")
+    sweep_parser.add_argument('config_file', help="Client config YAML file")
+    sweep_parser.add_argument('grid_file', help="Parameter grid YAML: nested config keys mapping to lists of values")
+    sweep_parser.add_argument('--num_processes', '-n', type=int, default=4, help="Number of parallel processes (default: 4, max: 20)")
+    sweep_parser.add_argument('--timeout', type=int, default=30, help="Timeout per parameter set in minutes (default: 30)")
+    sweep_parser.add_argument('--warm', action='store_true', help="Submit the sweep to a running warm daemon (see start_daemon)")
+    sweep_parser.add_argument('--socket', type=os.path.abspath, default=WARM_SOCKET, help=f"Warm daemon socket used with --warm (default: {WARM_SOCKET})")
+
+    # start_daemon / stop_daemon subcommands (warm interpreter with pandas, calendars and data preloaded)
+    daemon_parser = subparsers.add_parser('start_daemon')
+    daemon_parser.add_argument('preload_configs', nargs='*', help="Client config YAML files whose calendars and historical data to preload")
+    daemon_parser.add_argument('--socket', type=os.path.abspath, default=WARM_SOCKET, help=f"Unix socket to accept jobs on (default: {WARM_SOCKET})")
+    stop_daemon_parser = subparsers.add_parser('stop_daemon')
+    stop_daemon_parser.add_argument('--socket', type=os.path.abspath, default=WARM_SOCKET, help=f"Socket of the daemon to stop (default: {WARM_SOCKET})")
 
     # stop_server subcommand
     stop_server_parser = subparsers.add_parser('stop_server')
@@ -97,9 +173,17 @@ def main():
     stop_client_parser.add_argument('client_script', help="Client script file to locate PID folder")
     stop_client_parser.add_argument('config_file', help="Client config YAML file to load client_name")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if getattr(args, 'warm', False):
+        if args.command == 'start_client' and args.mode != 'replay':
+            sys.exit("--warm only supports replay mode.")
+        from core.warm_daemon import submit_job
+        job_argv = [a for a in (sys.argv[1:] if argv is None else argv) if a != '--warm']
+        sys.exit(submit_job(args.socket, {'argv': job_argv, 'cwd': os.getcwd()}))
 
     if args.command == 'start_server':
+        from core.arch_manager import ArchManager
         if args.mode != 'live':
             sys.exit("Server only supports live mode.")
         config = load_config(args.config_file)
@@ -115,6 +199,7 @@ def main():
         manager.start()
 
     elif args.command == 'start_client':
+        from core.arch_client import ArchClient
         config = load_config(args.config_file)
         if 'region' not in config:
             sys.exit("Config must include 'region' (e.g., amer, apac).")
@@ -127,7 +212,7 @@ def main():
         mode_str = None
         if args.mode == 'replay':
             run_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            mode_str = "parallel" if args.parallel else "sequential"
+            mode_str = "distributed" if args.distributed else ("parallel" if args.parallel else "sequential")
 
         # Determine client's folder path for logs and outputs
         client_script_abs = os.path.abspath(args.client_script)
@@ -162,10 +247,54 @@ def main():
             # Convert timeout from minutes to seconds
             timeout_seconds = args.timeout * 60
             # Call the helper function for replay logic
-            replay_helper.run_replay(config, args.parallel, client_class, client_script_abs, client_dir, config_name, log_dir, run_timestamp, num_processes, timeout_seconds)
+            import core.replay_helper as replay_helper
+            replay_helper.run_replay(config, args.parallel, client_class, client_script_abs, client_dir, config_name, log_dir, run_timestamp, num_processes, timeout_seconds, args.distributed, args.chunk_size)
 
             os.remove(pid_file)  # Clean up after completion (replay finishes)
 
+    elif args.command == 'sweep':
+        from core.sweep_helper import data_param_paths, run_sweep
+        config = load_config(args.config_file)
+        if 'region' not in config:
+            sys.exit("Config must include 'region' (e.g., amer, apac).")
+        if 'client_name' not in config:
+            sys.exit("Config must include 'client_name' (e.g., myclient1).")
+        config['mode'] = 'replay'
+        grid = load_config(args.grid_file) or {}
+        bad_paths = data_param_paths(grid)  # Checked before logging/pid setup so nothing is loaded or left behind
+        if bad_paths:
+            sys.exit(f"Sweep grid cannot vary data-loading keys (data is loaded once for all sets): {', '.join(bad_paths)}")
+        run_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        client_script_abs = os.path.abspath(args.client_script)
+        client_dir = os.path.dirname(client_script_abs)
+        config_name = os.path.splitext(os.path.basename(args.config_file))[0]
+        log_dir = setup_logging(config, 'replay', is_server=False, client_dir=client_dir, config_name=config_name, run_timestamp=run_timestamp, mode_str='sweep')
+        pid_file = f"{os.path.join(client_dir, 'pids')}/{config['client_name']}.pid"
+        write_pid(pid_file)
+        logging.info(f"Starting sweep for client {config['client_name']} with grid {args.grid_file}... PID written to {pid_file}")
+        run_sweep(config, client_script_abs, client_dir, config_name, log_dir, run_timestamp, grid, max(1, min(args.num_processes, 20)), args.timeout * 60)
+        os.remove(pid_file)
+
+    elif args.command == 'replay_worker':
+        import redis
+        from core.distributed_helper import run_worker
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(processName)s - %(message)s')
+        run_worker(redis.Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db), args.idle_timeout)
+
+    elif args.command == 'start_daemon':
+        if process_alive(warm_pid_file(args.socket)):
+            sys.exit(f"A warm daemon is already running on {args.socket}; stop it with 'arch stop_daemon --socket {args.socket}'")
+        from core.warm_daemon import preload, serve
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(processName)s - %(message)s')
+        preload([load_config(path) for path in args.preload_configs])
+        pid_file = warm_pid_file(args.socket)
+        write_pid(pid_file)
+        logging.info(f"Warm daemon ready on {args.socket}... PID written to {pid_file}")
+        serve(args.socket, run_warm_job)
+
+    elif args.command == 'stop_daemon':
+        stop_process(warm_pid_file(args.socket))
+
     elif args.command == 'stop_server':
         pid_file = f"pids/arch_server_{args.region}.pid"
         stop_process(pid_file)
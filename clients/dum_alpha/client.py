@@ -6,7 +6,7 @@ import logging
 class Client1(ArchClient):  # Must inherit from ArchClient
     def initialize(self):
         # Example: Add custom info to context during initialization
-        self.context['custom_strategy_param'] = 2.0  # Example custom addition
+        self.context['custom_strategy_param'] = self.config.get('custom_client_info', {}).get('strategy_param', 2.0)  # Example custom addition (swept in configs/sweep_grid.yaml)
         logging.info(f"Initialized Client1 with custom context: {self.context}")
 
     def generate(self, data):
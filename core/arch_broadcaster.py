@@ -1,28 +1,118 @@
 # core/arch_broadcaster.py
 import redis
 import json
-import logging
 import os
+import datetime
+import numpy as np
+import pandas as pd
+from .log_helper import period_logger
+
+def delta_keys(region):
+    """Redis keys holding the latest delta-mode snapshot and the deltas published since it."""
+    return f"delta|region|{region}|snapshot", f"delta|region|{region}|log"
+
+def _row_keys(df):
+    # Content hash per row plus occurrence number, so identical rows stay distinct
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    occurrence = hashes.groupby(hashes).cumcount()
+    return pd.Index(hashes.astype(str) + ':' + occurrence.astype(str))
+
+def _encode_stamp(value):
+    # Tag the type so the client restores Timestamp/date/time rather than plain strings
+    if isinstance(value, datetime.datetime):  # Includes pd.Timestamp
+        return ['timestamp', value.isoformat()]
+    if isinstance(value, datetime.date):
+        return ['date', value.isoformat()]
+    if isinstance(value, datetime.time):
+        return ['time', value.isoformat()]
+    return ['value', value.item() if hasattr(value, 'item') else value]
+
+def decode_stamp(encoded):
+    kind, value = encoded
+    if kind == 'timestamp':
+        return pd.Timestamp(value)
+    if kind == 'date':
+        return datetime.date.fromisoformat(value)
+    if kind == 'time':
+        return datetime.time.fromisoformat(value)
+    return value
 
 class ArchBroadcaster:
     def __init__(self, config):
         self.config = config
         self.redis = redis.Redis(host=config['redis_host'], port=config['redis_port'], db=config['redis_db'])
+        # Delta mode: publish a full snapshot every snapshot_every periods, otherwise only changed rows
+        self.delta_mode = config.get('broadcast_mode', 'full') == 'delta'
+        self.snapshot_every = max(1, int(config.get('snapshot_every', 60)))
+        self._seq = 0
+        self._last_keys = {}  # df_type -> row keys of the last published state
+        # Per-period stamp columns: left out of the row diff when constant within a frame and sent once per
+        # message instead, otherwise every row would look changed every period
+        self.stamp_columns = config.get('delta_stamp_columns', ['refts', 'date', 'time'])
+
+    def _build_delta_payload(self, data):
+        self._seq += 1
+        is_snapshot = (self._seq - 1) % self.snapshot_every == 0
+        payload = {}
+        for df_type, df in data.items():
+            columns = [str(c) for c in df.columns]  # Clients restore this order; stamps would otherwise end up last
+            stamp_cols = [c for c in self.stamp_columns if c in df.columns and len(df) and df[c].nunique(dropna=False) == 1]
+            stamp = {c: _encode_stamp(df[c].iloc[0]) for c in stamp_cols}
+            df = df.drop(columns=stamp_cols)
+            keys = _row_keys(df)
+            if is_snapshot or df_type not in self._last_keys:
+                changed = np.ones(len(df), dtype=bool)
+                removed = []
+                part = {'reset': True}  # Records are sent in frame order
+            else:
+                prev = self._last_keys[df_type]
+                changed = ~keys.isin(prev)
+                removed = prev[~prev.isin(keys)].tolist()
+                # Row order: if the unchanged rows kept their relative order, the positions of the changed rows
+                # are enough for the client to slot them back in; otherwise send the whole key order
+                if prev[prev.isin(keys)].equals(keys[~changed]):
+                    part = {'positions': np.flatnonzero(changed).tolist()}
+                else:
+                    part = {'order': keys.tolist()}
+            part['columns'] = columns
+            part['stamp'] = stamp
+            part['removed'] = removed
+            part['keys'] = keys[changed].tolist()
+            part['records'] = df[changed].to_dict(orient='records')
+            payload[df_type] = part
+            self._last_keys[df_type] = keys
+        for df_type in set(self._last_keys) - set(data):
+            payload[df_type] = {'drop': True}
+            del self._last_keys[df_type]
+        return {'_seq': self._seq, '_kind': 'snapshot' if is_snapshot else 'delta', '_data': payload}
 
     def broadcast(self, period_start, data):
         region = self.config['region']
         # Use specified format with '|' and compact timestamp
         timestamp_str = period_start.strftime('%Y%m%dT%H%M')
         channel = f"data|region|{region}|period|{timestamp_str}"
-        serialized_data = json.dumps({df_type: df.to_dict(orient='records') for df_type, df in data.items()})
+        if self.delta_mode:
+            payload = self._build_delta_payload(data)
+            serialized_data = json.dumps(payload)
+            # Persist before publishing so a client resyncing on this message can already see it
+            snapshot_key, log_key = delta_keys(region)
+            pipe = self.redis.pipeline()
+            if payload['_kind'] == 'snapshot':
+                pipe.set(snapshot_key, serialized_data)
+                pipe.delete(log_key)
+            else:
+                pipe.rpush(log_key, serialized_data)
+            pipe.execute()
+        else:
+            serialized_data = json.dumps({df_type: df.to_dict(orient='records') for df_type, df in data.items()})
         self.redis.publish(channel, serialized_data)
-        logging.info(f"Broadcast data to channel {channel} for region {region}")
+        period_logger.info("Broadcast data to channel %s for region %s", channel, region)
 
-        # Archive to disk in live mode
+        # Archive to disk in live mode (in delta mode this is the published delta/snapshot payload)
         if self.config['mode'] == 'live':
             archive_dir = self.config.get('archive_dir', './archive')
             os.makedirs(archive_dir, exist_ok=True)
             archive_file = f"{archive_dir}/region_{region}_period_{timestamp_str}.json"
             with open(archive_file, 'w') as f:
                 f.write(serialized_data)
-            logging.info(f"Archived live data to {archive_file}")
+            period_logger.info("Archived live data to %s", archive_file)
@@ -4,6 +4,9 @@ import json
 import pandas as pd
 import logging
 import os
+from .history_buffer import build_history
+from .arch_broadcaster import delta_keys, decode_stamp
+from .log_helper import period_logger
 
 class ArchClient:
     """Base class for clients. Subclasses must implement initialize and generate."""
@@ -13,6 +16,11 @@ class ArchClient:
         self.redis = None  # Lazy init from previous patch
         self.pubsub = None
         self.context = {}  # Initialize context as empty dict
+        self._delta_state = {}  # df_type -> {row key: record}, reconstructed from delta broadcasts
+        self._delta_seq = None  # Sequence number of the last applied delta broadcast
+        self._delta_stamps = {}  # df_type -> {column: value} restamped onto every row (e.g. refts of the period)
+        self._delta_columns = {}  # df_type -> column order of the broadcast frame
+        self.history = build_history(self.config)  # Per-datasource lookback windows (configured via datasources.<ds>.history)
         self.initialize()  # Call subclass-specific initialization; context is populated here
 
     def _get_redis(self):
@@ -72,19 +80,36 @@ class ArchClient:
             with open(f"{output_dir}/outputs_{period_start.strftime('%Y-%m-%d_%H:%M')}_{self.client_name}.json", 'w') as f:
                 json.dump(serializable_outputs, f)
         
-        logging.info(f"Client {self.client_name} pushed outputs for {period_start}")
+        period_logger.info("Client %s pushed outputs for %s", self.client_name, period_start)
 
-    def process_period(self, period_start, data):
-        # Update context for this event/period (use pd.Timestamp)
+    def _update_context(self, period_start, data):
+        # Update context for this event/period (use pd.Timestamp); shared by replay and live, which set
+        # their own current_* data entries first
         self.context['current_date'] = pd.to_datetime(period_start).date()
         self.context['current_time'] = pd.to_datetime(period_start).time()
+        # Roll history windows; buffers hold references to the period frames, not copies
+        for ds, buffer in self.history.items():
+            if ds in data:
+                buffer.append(period_start, data[ds])
+        self.context['history'] = self.history
+        period_logger.debug("Updated context for period %s: %s", period_start, self.context)  # Lazy: context repr is costly
+
+    def warm_history(self, loader, prior_periods):
+        """Pre-fill history windows from earlier periods without generating (subjobs that start mid-replay)."""
+        for period_start, period_end in prior_periods:
+            data = loader.load_data(period_start, period_end)
+            for ds, buffer in self.history.items():
+                if ds in data:
+                    buffer.append(period_start, data[ds])
+
+    def process_period(self, period_start, data):
         self.context['current_universe'] = data['current_universe']
         self.context['current_market_data'] = data['market_data']
-        logging.debug(f"Updated context for period {period_start}: {self.context}")
+        self._update_context(period_start, data)
         
         outputs_df = self.generate(data)
         self.push(period_start, outputs_df)
-        logging.info(f"Client {self.client_name} processed period {period_start} directly (replay mode)")
+        period_logger.info("Client %s processed period %s directly (replay mode)", self.client_name, period_start)
 
     def listen(self):
         region = self.config['region']
@@ -105,13 +130,89 @@ class ArchClient:
                 return  # Skip invalid messages
             
             data_raw = json.loads(message['data'].decode())
-            data = {df_type: pd.DataFrame(records) for df_type, records in data_raw.items()}
+            if '_seq' in data_raw:  # Delta-mode broadcast (server config broadcast_mode: delta)
+                data = self._apply_delta_message(data_raw)
+                if data is None:
+                    return  # Out of sync and resync failed; wait for the next snapshot
+            else:
+                data = {df_type: pd.DataFrame(records) for df_type, records in data_raw.items()}
             
-            # Update context for this event/period (use pd.Timestamp)
-            self.context['current_date'] = pd.to_datetime(period_start).date()
-            self.context['current_time'] = pd.to_datetime(period_start).time()
-            self.context['current_market_data'] = data
-            logging.debug(f"Updated context for period {period_start}: {self.context}")
+            self.context['current_market_data'] = data  # Live: every broadcast frame, keyed by df_type
+            self._update_context(period_start, data)
             
             outputs_df = self.generate(data)
             self.push(period_start, outputs_df)
+
+    def _apply_delta_payload(self, payload):
+        if payload['_kind'] == 'snapshot':
+            self._delta_state = {}
+            self._delta_stamps = {}
+            self._delta_columns = {}
+        for df_type, part in payload['_data'].items():
+            if part.get('drop'):
+                self._delta_state.pop(df_type, None)
+                self._delta_stamps.pop(df_type, None)
+                self._delta_columns.pop(df_type, None)
+                continue
+            self._delta_stamps[df_type] = {c: decode_stamp(v) for c, v in part.get('stamp', {}).items()}
+            self._delta_columns[df_type] = part['columns']
+            changed = dict(zip(part['keys'], part['records']))
+            if part.get('reset'):
+                self._delta_state[df_type] = changed
+                continue
+            rows = self._delta_state.setdefault(df_type, {})
+            for key in part['removed']:
+                rows.pop(key, None)
+            if 'order' in part:
+                order = part['order']
+            else:
+                # Changed rows go to their positions in the new frame; unchanged rows fill the rest in their old order
+                order = [None] * (len(rows) + len(changed))
+                for position, key in zip(part['positions'], part['keys']):
+                    order[position] = key
+                unchanged = iter(rows)
+                order = [key if key is not None else next(unchanged) for key in order]
+            rows.update(changed)
+            self._delta_state[df_type] = {key: rows[key] for key in order}
+        self._delta_seq = payload['_seq']
+
+    def _resync_delta(self, target_seq):
+        """Rebuild state from the stored snapshot plus the deltas logged after it."""
+        snapshot_key, log_key = delta_keys(self.config['region'])
+        redis_conn = self._get_redis()
+        pipe = redis_conn.pipeline()
+        pipe.get(snapshot_key)
+        pipe.lrange(log_key, 0, -1)
+        snapshot, log = pipe.execute()
+        if snapshot is None:
+            return False
+        snapshot = json.loads(snapshot)
+        if snapshot['_seq'] > target_seq:
+            return False  # Already past the message being handled; its state is gone, the snapshot's own message follows
+        self._apply_delta_payload(snapshot)
+        for entry in log:
+            payload = json.loads(entry)
+            if payload['_seq'] <= self._delta_seq:
+                continue
+            if payload['_seq'] != self._delta_seq + 1 or payload['_seq'] > target_seq:
+                break  # Stop at the message being handled; later ones arrive through pubsub
+            self._apply_delta_payload(payload)
+        return self._delta_seq >= target_seq
+
+    def _apply_delta_message(self, payload):
+        """Apply a delta broadcast; returns {df_type: DataFrame} of the full state, or None if out of sync."""
+        seq = payload['_seq']
+        if payload['_kind'] == 'snapshot' or (self._delta_seq is not None and seq == self._delta_seq + 1):
+            self._apply_delta_payload(payload)
+        elif self._delta_seq is not None and seq <= self._delta_seq:
+            logging.warning(f"Client {self.client_name} ignoring stale delta broadcast {seq} (at {self._delta_seq})")
+            return None
+        else:
+            logging.warning(f"Client {self.client_name} detected delta gap (at {self._delta_seq}, got {seq}); resyncing")
+            if not self._resync_delta(seq):
+                logging.error(f"Client {self.client_name} failed to resync delta broadcast {seq}; waiting for next snapshot")
+                self._delta_seq = None
+                return None
+        return {df_type: pd.DataFrame([dict(record, **self._delta_stamps.get(df_type, {})) for record in rows.values()],
+                                      columns=self._delta_columns.get(df_type))
+                for df_type, rows in self._delta_state.items()}
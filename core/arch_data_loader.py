@@ -1,3 +1,5 @@
+import os
+import numpy as np
 import pandas as pd
 import requests
 import logging
@@ -5,6 +7,12 @@ from dateutil.relativedelta import relativedelta
 import warnings
 from .period_helper import get_periods_comprehensive
 from .universe_helper import get_universe
+from .log_helper import period_logger
+
+# Process-wide cache of typed historical frames: (file, columns, dtypes) -> (mtime, frame, refts array).
+# Shared by every loader in the process, so forked workers and warm-daemon jobs reuse already-read files;
+# a rewritten file replaces its entry rather than adding one.
+_HISTORICAL_CACHE = {}
 
 class ArchDataLoader:
     def __init__(self, config):
@@ -12,6 +20,7 @@ class ArchDataLoader:
         self.datasources = config.get('datasources', {})
         if 'market_data' not in self.datasources.keys():
             raise ValueError("'datasources' must include 'market_data' as mandatory.")
+        self._historical_frames = {}  # ds -> (frame sorted by refts, refts array); loaded once per loader
         self.decide_universe()
 
     def load_data(self, period_start, period_end):
@@ -47,8 +56,8 @@ class ArchDataLoader:
                 'value3': [3, 2, 33]
             })
             # In real impl: Fetch from API, filter by region/period if needed
-            data[ds] = df
-            logging.info(f"Loaded live {ds} for region {region}")
+            data[ds] = self._apply_schema(ds, df)
+            period_logger.info("Loaded live %s for region %s", ds, region)
         return data
 
     def _load_historical_data(self, period_start, period_end):
@@ -58,15 +67,56 @@ class ArchDataLoader:
         data['current_universe'] = self._slice_universe(period_start, period_end)
         for ds in self.datasources.keys():
             try:
-                file_path = f"{self.config['historical_dir']}/{region}/{ds}.csv"
-                df = pd.read_csv(file_path, parse_dates=['refts', 'date', 'time'])
-                mask = (df['refts'] >= period_start) & (df['refts'] <= period_end)  # Use 'refts' to slice data
-                data[ds] = df.loc[mask].reset_index(drop=True)
-                logging.info(f"Loaded historical {ds} from {file_path} for region {region}")
+                df, refts = self._get_historical_frame(ds)
+                lo, hi = _sorted_range(refts, period_start, period_end)  # Use 'refts' to slice data
+                if self._ds_option(ds, 'copy', True):
+                    data[ds] = df.iloc[lo:hi].reset_index(drop=True)
+                else:
+                    # View onto the cached frame: no per-period allocation, callers must not mutate it in place
+                    data[ds] = df.iloc[lo:hi]
+                    data[ds].index = pd.RangeIndex(hi - lo)
+                period_logger.info("Loaded historical %s for region %s", ds, region)
             except Exception as e:
                 logging.error(f"Error loading historical {ds} for region {region}: {e}")
         return data
 
+    def _ds_option(self, ds, key, default=None):
+        ds_cfg = self.datasources.get(ds)
+        if isinstance(ds_cfg, dict) and ds_cfg.get(key) is not None:
+            return ds_cfg[key]
+        return default
+
+    def _get_historical_frame(self, ds):
+        """Read a datasource file once with its configured columns/dtypes, sorted by 'refts'."""
+        if ds not in self._historical_frames:
+            file_path = f"{self.config['historical_dir']}/{self.config['region']}/{ds}.csv"
+            columns = self._ds_option(ds, 'columns')
+            if columns is not None and 'refts' not in columns:
+                columns = ['refts'] + list(columns)  # 'refts' is always needed to slice periods
+            dtypes = self._ds_option(ds, 'dtypes', {})
+            cache_key = (os.path.abspath(file_path), tuple(columns or ()), tuple(sorted(dtypes.items())))
+            mtime = os.path.getmtime(file_path)
+            if cache_key not in _HISTORICAL_CACHE or _HISTORICAL_CACHE[cache_key][0] != mtime:
+                _HISTORICAL_CACHE.pop(cache_key, None)  # Drop the stale frame before reading the new one
+                parse_dates = [c for c in ['refts', 'date', 'time'] if columns is None or c in columns]
+                df = pd.read_csv(file_path, usecols=columns, parse_dates=parse_dates,
+                                 dtype={c: t for c, t in dtypes.items() if c not in parse_dates} or None)
+                df = df.sort_values('refts', kind='stable').reset_index(drop=True)
+                _HISTORICAL_CACHE[cache_key] = (mtime, df, df['refts'].to_numpy(dtype='datetime64[ns]'))
+                logging.info(f"Cached historical {ds} from {file_path} ({len(df)} rows, {df.memory_usage(deep=True).sum()} bytes)")
+            self._historical_frames[ds] = _HISTORICAL_CACHE[cache_key][1:]
+        return self._historical_frames[ds]
+
+    def _apply_schema(self, ds, df):
+        """Project and cast a freshly fetched frame using the datasource's 'columns'/'dtypes' config."""
+        columns = self._ds_option(ds, 'columns')
+        if columns is not None:
+            df = df[[c for c in df.columns if c == 'refts' or c in columns]]
+        dtypes = self._ds_option(ds, 'dtypes')
+        if dtypes:
+            df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+        return df
+
     def get_periods(self):
         config = {}
         config['start_date'] = self.config['historical_range']['start']
@@ -91,9 +141,22 @@ class ArchDataLoader:
         end_date = self.config['historical_range']['end']
         universe_data = get_universe(self.config['universe'], start_date, end_date)
         # Assuming universe_data is a pd.DataFrame with 'date' and 'instrument_id' columns
-        self.universe_df = universe_data.copy()
+        # Sort by date once so each period is a contiguous row range located by binary search
+        self.universe_df = universe_data.sort_values('date', kind='stable').reset_index(drop=True)
         self.universe_df['in_universe'] = 1
+        self._universe_dates = self.universe_df['date'].to_numpy(dtype='datetime64[ns]')
+        self._universe_memo = (None, 0, 0)  # (day range, lo, hi) reused across intraday periods
 
     def _slice_universe(self, period_start, period_end):
-        mask = (self.universe_df['date'] >= period_start.normalize()) & (self.universe_df['date'] <= period_end.normalize()) # Use 'date' and period normalize() for slicing universe
-        return self.universe_df.loc[mask].reset_index(drop=True)
+        # Use 'date' and period normalize() for slicing universe; same day range -> same membership
+        key = (period_start.normalize(), period_end.normalize())
+        if self._universe_memo[0] != key:
+            self._universe_memo = (key,) + _sorted_range(self._universe_dates, key[0], key[1])
+        _, lo, hi = self._universe_memo
+        return self.universe_df.iloc[lo:hi].reset_index(drop=True)  # Fresh frame per period; only offsets are shared
+
+def _sorted_range(sorted_values, start, end):
+    """Return (lo, hi) such that sorted_values[lo:hi] lies within [start, end]."""
+    lo = np.searchsorted(sorted_values, np.datetime64(start, 'ns'), side='left')
+    hi = np.searchsorted(sorted_values, np.datetime64(end, 'ns'), side='right')
+    return int(lo), int(hi)
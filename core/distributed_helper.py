@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+import pandas as pd
+import redis
+from .arch_data_loader import ArchDataLoader
+from .history_buffer import build_history, warmup_periods
+
+# Shared work queue; every task names its run so one pool of workers can serve many coordinators
+QUEUE_KEY = "replay|queue"
+HEARTBEAT_TTL = 30  # Seconds a worker's heartbeat outlives it; its claimed chunks are re-queued after that
+
+def _job_key(run_id):
+    return f"replay|run|{run_id}|job"
+
+def _results_key(run_id):
+    return f"replay|run|{run_id}|results"
+
+def _processing_key(worker_name):
+    # Chunks a worker has claimed but not yet reported on
+    return f"replay|processing|{worker_name}"
+
+def _heartbeat_key(worker_name):
+    return f"replay|worker|{worker_name}|alive"
+
+def requeue_orphans(redis_conn, run_id):
+    """Move chunks of run_id claimed by workers whose heartbeat expired back onto the queue; returns how many."""
+    requeued = 0
+    for processing_key in redis_conn.scan_iter(match=_processing_key('*')):
+        worker_name = processing_key.decode().split('|', 2)[2]
+        if redis_conn.exists(_heartbeat_key(worker_name)):
+            continue
+        for raw in redis_conn.lrange(processing_key, 0, -1):
+            task = json.loads(raw)
+            if task['run_id'] != run_id and redis_conn.exists(_job_key(task['run_id'])):
+                continue  # Live run of another coordinator; it re-queues its own chunks
+            # LREM decides who owns the chunk when several coordinators sweep the same dead worker
+            if redis_conn.lrem(processing_key, 1, raw) and task['run_id'] == run_id:
+                redis_conn.lpush(QUEUE_KEY, raw)
+                requeued += 1
+                logging.warning(f"Worker {worker_name} is gone; re-queued chunk {task['chunk_id']} of run {run_id}")
+    return requeued
+
+def get_redis(config):
+    return redis.Redis(host=config.get('redis_host', 'localhost'), port=config.get('redis_port', 6379), db=config.get('redis_db', 0))
+
+def run_distributed_replay(config, periods, client_script_abs, client_dir, sublog_dir, replay_run_name, run_timestamp, chunk_size=20, timeout_seconds=1800):
+    """Coordinator: enqueue period chunks, wait for worker reports, return (successful, failed) periods.
+
+    A run gives up on outstanding chunks once no report has arrived for timeout_seconds. Chunks held by
+    a worker that died (no heartbeat for HEARTBEAT_TTL seconds) are put back on the queue and run again
+    from the start; with parquet output, periods that worker had already finished in the chunk are then
+    written twice. The client script, historical_dir and output_dir must be reachable at the same paths
+    on every worker host. Each chunk writes its outputs under <output_dir>/chunk=<chunk_id>/.
+    """
+    redis_conn = get_redis(config)
+    run_id = f"{replay_run_name}_{run_timestamp}_{uuid.uuid4().hex[:8]}"
+    chunk_size = max(1, chunk_size)
+    chunks = [periods[i:i + chunk_size] for i in range(0, len(periods), chunk_size)]
+    job = {
+        'config': config,
+        'client_script_abs': client_script_abs,
+        'client_name': config['client_name'],
+        'client_dir': client_dir,
+        'sublog_dir': sublog_dir,
+        'replay_run_name': replay_run_name,
+        'run_timestamp': run_timestamp,
+    }
+    # Each chunk starts with a fresh client; ship the preceding periods its history windows need
+    history = build_history(config)
+    starts = [start for start, _ in periods]
+    tasks = [json.dumps({'run_id': run_id, 'chunk_id': i, 'periods': [[str(s), str(e)] for s, e in chunk],
+                         'warmup': [[str(s), str(e)] for s, e in warmup_periods(history, periods, i * chunk_size, starts)]})
+             for i, chunk in enumerate(chunks)]
+    redis_conn.set(_job_key(run_id), json.dumps(job, default=str))  # default=str: YAML dates in config
+    if tasks:
+        redis_conn.rpush(QUEUE_KEY, *tasks)
+    logging.info(f"Enqueued {len(tasks)} chunks ({len(periods)} periods) for distributed run {run_id}")
+
+    successful_periods = []
+    failed_periods = []
+    pending = set(range(len(chunks)))
+    last_report = last_sweep = time.monotonic()
+    try:
+        while pending:
+            item = redis_conn.blpop(_results_key(run_id), timeout=min(timeout_seconds, HEARTBEAT_TTL))
+            now = time.monotonic()
+            if now - last_sweep >= HEARTBEAT_TTL:
+                requeue_orphans(redis_conn, run_id)
+                last_sweep = now
+            if item is None:
+                if now - last_report >= timeout_seconds:
+                    logging.error(f"No worker report for run {run_id} within {timeout_seconds}s; {len(pending)} chunks outstanding")
+                    break
+                continue
+            last_report = now
+            result = json.loads(item[1])
+            chunk_id = result['chunk_id']
+            if chunk_id not in pending:
+                continue  # Duplicate report (e.g. chunk re-run after a worker restart)
+            pending.discard(chunk_id)
+            chunk = chunks[chunk_id]
+            successful_periods.extend(chunk[i] for i in result['ok'])
+            for i, error in result['failed']:
+                failed_periods.append(chunk[i])
+                logging.error(f"Worker {result['worker']} failed period {chunk[i]}: {error}")
+            logging.info(f"Chunk {chunk_id} done on {result['worker']} ({len(chunks) - len(pending)}/{len(chunks)})")
+    finally:
+        # Withdraw chunks nobody picked up and drop run state
+        for chunk_id in pending:
+            redis_conn.lrem(QUEUE_KEY, 1, tasks[chunk_id])
+            failed_periods.extend(chunks[chunk_id])
+        redis_conn.delete(_job_key(run_id), _results_key(run_id))
+    return successful_periods, failed_periods
+
+def process_chunk(job, loader, task, worker_name):
+    """Run one chunk of periods with a single client instance; returns the report sent to the coordinator."""
+    # Imported here to avoid a cycle: replay_helper imports this module lazily in run_replay
+    from .replay_helper import load_client_class
+    periods = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in task['periods']]
+    subjob_log_file = f"{job['sublog_dir']}/{job['replay_run_name']}_{job['run_timestamp']}_{worker_name}_chunk{task['chunk_id']}.log"
+    os.makedirs(job['sublog_dir'], exist_ok=True)
+    subjob_logger = logging.getLogger(f"subjob_chunk{task['chunk_id']}")
+    subjob_logger.setLevel(logging.INFO)
+    fh = logging.FileHandler(subjob_log_file)
+    fh.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(processName)s - %(message)s'))
+    subjob_logger.addHandler(fh)
+
+    report = {'chunk_id': task['chunk_id'], 'worker': worker_name, 'ok': [], 'failed': []}
+    try:
+        # Own output partition per chunk: workers on any host would otherwise append to the same parquet file
+        config = dict(job['config'], output_dir=os.path.join(job['config']['output_dir'], f"chunk={task['chunk_id']}"))
+        try:
+            client = load_client_class(job['client_script_abs'])(config, job['client_name'])
+        except Exception as e:
+            subjob_logger.exception(f"Distributed ({worker_name}): Failed to set up client: {e}")
+            report['failed'] = [[i, f"client setup failed: {e}"] for i in range(len(periods))]
+            return report
+        try:
+            client.warm_history(loader, [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in task.get('warmup', [])])
+        except Exception as e:
+            subjob_logger.exception(f"Distributed ({worker_name}): Failed to warm history: {e}")
+            report['failed'] = [[i, f"history warm-up failed: {e}"] for i in range(len(periods))]
+            return report
+        for i, (period_start, period_end) in enumerate(periods):
+            try:
+                subjob_logger.info(f"Distributed ({worker_name}): Starting processing for period {period_start} to {period_end}")
+                data = loader.load_data(period_start, period_end)
+                client.process_period(period_start, data)
+                subjob_logger.info(f"Distributed ({worker_name}): Finished processing for period {period_start} to {period_end}")
+                report['ok'].append(i)
+            except Exception as e:
+                subjob_logger.exception(f"Distributed ({worker_name}): Failed to process period {period_start}: {e}")
+                report['failed'].append([i, f"{e}\n{traceback.format_exc()}"])
+        return report
+    finally:
+        subjob_logger.removeHandler(fh)
+        fh.close()
+
+def _heartbeat(redis_conn, worker_name, stop):
+    # Keeps the worker's claimed chunks from being re-queued while it is alive, even during long chunks
+    while True:
+        redis_conn.set(_heartbeat_key(worker_name), 1, ex=HEARTBEAT_TTL)
+        if stop.wait(HEARTBEAT_TTL / 3):
+            return
+
+def _report(redis_conn, run_id, report):
+    redis_conn.rpush(_results_key(run_id), json.dumps(report))
+    redis_conn.expire(_results_key(run_id), 86400)  # Don't leak reports of runs whose coordinator is gone
+
+def run_worker(redis_conn, idle_timeout=0):
+    """Worker loop: pull chunks from the shared queue and report back until idle for idle_timeout seconds (0 = forever).
+
+    Each chunk is moved atomically from the queue to this worker's processing list and only removed from
+    there once its report is pushed, so a coordinator can re-queue it if this worker dies in between.
+    """
+    worker_name = f"{socket.gethostname()}_{os.getpid()}"
+    processing_key = _processing_key(worker_name)
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(redis_conn, worker_name, stop), daemon=True).start()
+    current = (None, None, None)  # (run_id, job, loader) reused while consecutive chunks belong to one run
+    logging.info(f"Replay worker {worker_name} waiting for chunks on '{QUEUE_KEY}'")
+    try:
+        while True:
+            raw = redis_conn.blmove(QUEUE_KEY, processing_key, idle_timeout, 'LEFT', 'RIGHT')
+            if raw is None:
+                logging.info(f"Replay worker {worker_name} idle for {idle_timeout}s; exiting")
+                return
+            task = json.loads(raw)
+            run_id = task['run_id']
+            if current[0] != run_id:
+                job_raw = redis_conn.get(_job_key(run_id))
+                if job_raw is None:
+                    logging.warning(f"Skipping chunk {task['chunk_id']} of finished or unknown run {run_id}")
+                    redis_conn.lrem(processing_key, 1, raw)
+                    continue
+                job = json.loads(job_raw)
+                job['config']['mode'] = 'replay'
+                try:
+                    loader = ArchDataLoader(job['config'])
+                except Exception as e:
+                    logging.exception(f"Failed to create loader for run {run_id}: {e}")
+                    _report(redis_conn, run_id, {'chunk_id': task['chunk_id'], 'worker': worker_name, 'ok': [],
+                                                 'failed': [[i, f"loader setup failed: {e}"] for i in range(len(task['periods']))]})
+                    redis_conn.lrem(processing_key, 1, raw)
+                    continue
+                current = (run_id, job, loader)
+            _, job, loader = current
+            logging.info(f"Replay worker {worker_name} running chunk {task['chunk_id']} of run {run_id}")
+            _report(redis_conn, run_id, process_chunk(job, loader, task, worker_name))
+            redis_conn.lrem(processing_key, 1, raw)
+    finally:
+        # A clean exit leaves nothing to recover; a crash skips this and the heartbeat lapses instead
+        stop.set()
+        redis_conn.delete(_heartbeat_key(worker_name))
@@ -0,0 +1,125 @@
+# core/history_buffer.py
+import bisect
+import pandas as pd
+
+class HistoryBuffer:
+    """Bounded per-datasource lookback window of period frames.
+
+    Backed by a preallocated ring of slots so memory stays O(window). The window is
+    configured as a number of periods, a time span (e.g. '5D', '30min'), or both.
+    """
+    __slots__ = ('periods', 'span', '_stamps', '_frames', '_head', '_size')
+
+    def __init__(self, periods=None, span=None, initial_capacity=64):
+        if periods is None and span is None:
+            raise ValueError("HistoryBuffer needs 'periods' and/or 'span'")
+        if periods is not None and int(periods) < 1:
+            raise ValueError(f"HistoryBuffer 'periods' must be >= 1, got {periods}")
+        self.periods = int(periods) if periods is not None else None
+        self.span = pd.Timedelta(span) if span is not None else None
+        capacity = self.periods if self.periods is not None else initial_capacity
+        self._stamps = [None] * capacity  # Preallocated slots
+        self._frames = [None] * capacity
+        self._head = 0  # Slot index of the oldest entry
+        self._size = 0
+
+    @classmethod
+    def from_config(cls, history_cfg):
+        """Build from a datasource's 'history' entry: an int (periods), a str (span, e.g. '5D') or {periods, span}."""
+        if isinstance(history_cfg, int):
+            return cls(periods=history_cfg)
+        if isinstance(history_cfg, str):
+            return cls(span=history_cfg)
+        return cls(periods=history_cfg.get('periods'), span=history_cfg.get('span'))
+
+    def warmup_count(self, starts, index):
+        """How many periods right before starts[index] would still be in the window at starts[index] (starts sorted)."""
+        count = index
+        if self.periods is not None:
+            count = min(count, self.periods - 1)
+        if self.span is not None:
+            cutoff = pd.to_datetime(starts[index]) - self.span
+            count = min(count, index - bisect.bisect_right(starts, cutoff, 0, index))
+        return count
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        # Only span-bounded buffers grow; period-bounded ones overwrite the oldest slot
+        stamps, frames = list(self.stamps()), list(self.frames())
+        capacity = len(self._stamps) * 2
+        self._stamps = stamps + [None] * (capacity - len(stamps))
+        self._frames = frames + [None] * (capacity - len(frames))
+        self._head = 0
+
+    def _pop_oldest(self):
+        self._stamps[self._head] = None
+        self._frames[self._head] = None
+        self._head = (self._head + 1) % len(self._stamps)
+        self._size -= 1
+
+    def append(self, period_start, df):
+        """Add one period's frame, evicting whatever falls outside the window."""
+        period_start = pd.to_datetime(period_start)
+        capacity = len(self._stamps)
+        if self._size == capacity:
+            if self.periods is not None:
+                self._pop_oldest()
+            else:
+                self._grow()
+                capacity = len(self._stamps)
+        slot = (self._head + self._size) % capacity
+        self._stamps[slot] = period_start
+        self._frames[slot] = df
+        self._size += 1
+        if self.span is not None:
+            cutoff = period_start - self.span
+            while self._size and self._stamps[self._head] <= cutoff:
+                self._pop_oldest()
+
+    def clear(self):
+        for i in range(len(self._stamps)):
+            self._stamps[i] = None
+            self._frames[i] = None
+        self._head = 0
+        self._size = 0
+
+    def stamps(self):
+        """Period starts in the window, oldest first."""
+        capacity = len(self._stamps)
+        return [self._stamps[(self._head + i) % capacity] for i in range(self._size)]
+
+    def frames(self):
+        """Period frames in the window, oldest first."""
+        capacity = len(self._frames)
+        return [self._frames[(self._head + i) % capacity] for i in range(self._size)]
+
+    def latest(self):
+        if not self._size:
+            return None
+        return self._frames[(self._head + self._size - 1) % len(self._frames)]
+
+    def to_frame(self):
+        """Concatenate the window into one DataFrame (oldest first); empty if no history yet."""
+        frames = [df for df in self.frames() if df is not None]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+def build_history(config):
+    """Create a HistoryBuffer for every datasource with a 'history' entry in config['datasources']."""
+    history = {}
+    for ds, ds_cfg in (config.get('datasources') or {}).items():
+        if isinstance(ds_cfg, dict) and ds_cfg.get('history') is not None:
+            history[ds] = HistoryBuffer.from_config(ds_cfg['history'])
+    return history
+
+def warmup_periods(history, periods, index, starts=None):
+    """Periods immediately before periods[index] needed to fill the history windows of a cold client."""
+    if not history:
+        return []
+    if starts is None:
+        starts = [start for start, _ in periods]
+    count = max(buffer.warmup_count(starts, index) for buffer in history.values())
+    return periods[index - count:index]
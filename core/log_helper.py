@@ -0,0 +1,102 @@
+# core/log_helper.py
+# Logging modes: 'sync' (default, handlers run on the calling thread) or 'queue' (records are handed to a
+# QueueHandler and written by a QueueListener thread, one sink per process). Config keys (flat):
+#   log_mode: sync | queue
+#   log_format: text | json
+#   log_period_level: level for per-period lines (logger 'arch.period'), e.g. WARNING to silence them
+#   log_sample_every: emit every Nth occurrence of each per-period line (warnings and errors always pass)
+import json
+import logging
+import os
+import queue
+from multiprocessing import util as mp_util
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(processName)s - %(message)s'
+
+# Per-period hot-path messages go through this logger so their level and sampling can be tuned separately
+period_logger = logging.getLogger('arch.period')
+
+_listener = None  # QueueListener of this process in queue mode
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'process': record.processName,
+            'pid': record.process,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SampleFilter(logging.Filter):
+    """Pass every Nth record per call site (file, line); WARNING and above always pass."""
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counts = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1
+        return count % self.every == 0
+
+class _RecordQueueHandler(QueueHandler):
+    """Enqueue records as they are; the stock prepare() pre-formats the message and drops exc_info, which
+    would leave the listener's (e.g. JSON) formatter with a text line and no traceback to format."""
+    def prepare(self, record):
+        return record
+
+def make_formatter(config):
+    return JsonFormatter() if config.get('log_format', 'text') == 'json' else logging.Formatter(LOG_FORMAT)
+
+def install_handlers(config, handlers, level=logging.INFO):
+    """Attach handlers to the root logger, behind a QueueListener thread in queue mode."""
+    formatter = make_formatter(config)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    global _listener
+    stop_queue_logging()  # Replace rather than stack listeners (e.g. a warm-daemon job re-installing)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.setLevel(level)
+    if config.get('log_mode', 'sync') == 'queue':
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Flush what is still queued on exit; multiprocessing finalizers also run when pool workers exit.
+        # Processes leaving through os._exit (warm-daemon jobs) must call stop_queue_logging themselves.
+        mp_util.Finalize(None, stop_queue_logging, exitpriority=0)
+        root.addHandler(_RecordQueueHandler(log_queue))
+    else:
+        for handler in handlers:
+            root.addHandler(handler)
+    configure_period_logging(config)
+
+def stop_queue_logging():
+    """Drain and stop this process's QueueListener, if any; safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+
+def configure_period_logging(config):
+    period_logger.setLevel(config.get('log_period_level', logging.NOTSET))
+    for log_filter in period_logger.filters[:]:
+        period_logger.removeFilter(log_filter)
+    if int(config.get('log_sample_every', 1)) > 1:
+        period_logger.addFilter(SampleFilter(config['log_sample_every']))
+
+def init_worker_logging(config, log_file):
+    """Pool initializer for queue mode: give each worker process its own sink instead of funnelling to the parent."""
+    log_file = log_file.format(pid=os.getpid())
+    install_handlers(config, [logging.FileHandler(log_file)])
@@ -2,8 +2,14 @@ import pandas as pd
 import logging
 from dateutil.relativedelta import relativedelta
 from datetime import datetime
+from functools import lru_cache
 import pandas_market_calendars as mcal
 
+@lru_cache(maxsize=None)
+def get_calendar(name):
+    # Calendar construction is costly; cache per process (warm-daemon jobs inherit the cache)
+    return mcal.get_calendar(name)
+
 def get_periods_comprehensive(config):
     start = pd.to_datetime(config['start_date'])
     end = pd.to_datetime(config['end_date'])
@@ -20,7 +26,7 @@ def get_periods_comprehensive(config):
         effective_end = end
 
     # Get trading calendar
-    cal = mcal.get_calendar(config['calendar'])
+    cal = get_calendar(config['calendar'])
     valid_days = cal.valid_days(start_date=start, end_date=end).normalize().tz_localize(None)
 
     if frequency == 'minute' or frequency.endswith('min'):
@@ -9,27 +9,43 @@ import traceback
 from .arch_data_loader import ArchDataLoader
 from .arch_calendar import Calendar
 from .arch_client import ArchClient
+from .log_helper import period_logger, init_worker_logging
+from .history_buffer import build_history, warmup_periods
+
+def load_client_class(client_script_abs):
+    """Import a client script and return its ArchClient subclass."""
+    spec = importlib.util.spec_from_file_location("client_module", client_script_abs)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    client_class = next((cls for cls in vars(module).values() if isinstance(cls, type) and issubclass(cls, ArchClient) and cls != ArchClient), None)
+    if not client_class:
+        raise ValueError(f"No ArchClient subclass found in {client_script_abs}")
+    return client_class
 
 def process_period_sequential(loader, client, period_tuple):
     period_start, period_end = period_tuple
-    logging.info(f"Sequential: Starting processing for period {period_start} to {period_end}")
+    period_logger.info("Sequential: Starting processing for period %s to %s", period_start, period_end)
     data = loader.load_data(period_start, period_end)
-    logging.info(f"Sequential: Data loaded for period {period_start} to {period_end}")
+    period_logger.info("Sequential: Data loaded for period %s to %s", period_start, period_end)
     client.process_period(period_start, data)
-    logging.info(f"Sequential: Finished processing for period {period_start} to {period_end}")
+    period_logger.info("Sequential: Finished processing for period %s to %s", period_start, period_end)
 
-def process_period_parallel(config, client_script_abs, client_name, client_dir, period_tuple, sublog_dir, replay_run_name, run_timestamp):
+def process_period_parallel(config, client_script_abs, client_name, client_dir, period_tuple, sublog_dir, replay_run_name, run_timestamp, warmup=()):
     period_start, period_end = period_tuple
     period_start_str = period_start.strftime('%Y%m%d') if isinstance(period_start, (pd.Timestamp, datetime)) else str(period_start)
     pid = os.getpid()
     subjob_log_file = f"{sublog_dir}/{replay_run_name}_{run_timestamp}_{pid}_{period_start_str}.log"
 
-    # Set up subjob-specific logger
-    subjob_logger = logging.getLogger(f"subjob_{period_start_str}")
-    subjob_logger.setLevel(logging.INFO)
-    fh = logging.FileHandler(subjob_log_file)
-    fh.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(processName)s - %(message)s'))
-    subjob_logger.addHandler(fh)
+    if config.get('log_mode', 'sync') == 'queue':
+        # Per-worker sink installed by the pool initializer; no per-period file handler
+        subjob_logger, fh = period_logger, None
+    else:
+        # Set up subjob-specific logger
+        subjob_logger = logging.getLogger(f"subjob_{period_start_str}")
+        subjob_logger.setLevel(logging.INFO)
+        fh = logging.FileHandler(subjob_log_file)
+        fh.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(processName)s - %(message)s'))
+        subjob_logger.addHandler(fh)
 
     try:
         # Copy config to avoid issues
@@ -42,28 +58,26 @@ def process_period_parallel(config, client_script_abs, client_name, client_dir,
         loader = ArchDataLoader(config)
         
         # Dynamically import client module
-        spec = importlib.util.spec_from_file_location("client_module", client_script_abs)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        client_class = next((cls for cls in vars(module).values() if isinstance(cls, type) and issubclass(cls, ArchClient) and cls != ArchClient), None)
-        if not client_class:
-            raise ValueError(f"No ArchClient subclass found in {client_script_abs}")
+        client_class = load_client_class(client_script_abs)
         
         # Create client instance
         client = client_class(config, client_name)
+        # Fresh client per subjob: refill its history windows from the preceding periods first
+        client.warm_history(loader, warmup)
         
         # Process the period with logging
-        subjob_logger.info(f"Parallel (PID {pid}): Starting processing for period {period_start} to {period_end}")
+        subjob_logger.info("Parallel (PID %s): Starting processing for period %s to %s", pid, period_start, period_end)
         data = loader.load_data(period_start, period_end)
-        subjob_logger.info(f"Parallel (PID {pid}): Data loaded for period {period_start} to {period_end}")
+        subjob_logger.info("Parallel (PID %s): Data loaded for period %s to %s", pid, period_start, period_end)
         client.process_period(period_start, data)
-        subjob_logger.info(f"Parallel (PID {pid}): Finished processing for period {period_start} to {period_end}")
+        subjob_logger.info("Parallel (PID %s): Finished processing for period %s to %s", pid, period_start, period_end)
         return period_tuple  # Return on success
     finally:
-        subjob_logger.removeHandler(fh)
-        fh.close()
+        if fh is not None:
+            subjob_logger.removeHandler(fh)
+            fh.close()
 
-def run_replay(config, is_parallel, client_class, client_script_abs, client_dir, config_name, log_dir, run_timestamp, num_processes=4, timeout_seconds=1800):
+def run_replay(config, is_parallel, client_class, client_script_abs, client_dir, config_name, log_dir, run_timestamp, num_processes=4, timeout_seconds=1800, is_distributed=False, chunk_size=20):
     loader = ArchDataLoader(config)
 
     # Use calendar if enabled in config
@@ -79,16 +93,30 @@ def run_replay(config, is_parallel, client_class, client_script_abs, client_dir,
     successful_periods = []
     failed_periods = []
 
-    if is_parallel:
+    if is_distributed:
+        from .distributed_helper import run_distributed_replay
+        logging.info(f"Running distributed replay in chunks of {chunk_size} periods; start workers with 'arch replay_worker'")
+        sublog_dir = f"{log_dir}/{replay_run_name}_{start_date}_{end_date}_distributed_{run_timestamp}"
+        os.makedirs(sublog_dir, exist_ok=True)
+        successful_periods, failed_periods = run_distributed_replay(config, periods, client_script_abs, client_dir, sublog_dir, replay_run_name, run_timestamp, chunk_size, timeout_seconds)
+    elif is_parallel:
         logging.info(f"Running parallel replay with {num_processes} processes and {timeout_seconds}s timeout per subjob")
         sublog_dir = f"{log_dir}/{replay_run_name}_{start_date}_{end_date}_parallel_{run_timestamp}"
         os.makedirs(sublog_dir, exist_ok=True)
-        import multiprocessing_logging
-        multiprocessing_logging.install_mp_handler()
-        with mp.Pool(processes=num_processes) as pool:
+        if config.get('log_mode', 'sync') == 'queue':
+            # One queued sink per worker process instead of a file handler per period funnelled through the parent
+            pool_kwargs = {'initializer': init_worker_logging, 'initargs': (config, f"{sublog_dir}/{replay_run_name}_{run_timestamp}_{{pid}}.log")}
+        else:
+            import multiprocessing_logging
+            multiprocessing_logging.install_mp_handler()
+            pool_kwargs = {}
+        history = build_history(config)
+        starts = [start for start, _ in periods]
+        with mp.Pool(processes=num_processes, **pool_kwargs) as pool:
             tasks = []
-            for period in periods:
-                process_func = partial(process_period_parallel, config, client_script_abs, config['client_name'], client_dir, period, sublog_dir, replay_run_name, run_timestamp)
+            for i, period in enumerate(periods):
+                warmup = warmup_periods(history, periods, i, starts)
+                process_func = partial(process_period_parallel, config, client_script_abs, config['client_name'], client_dir, period, sublog_dir, replay_run_name, run_timestamp, warmup)
                 tasks.append((period, pool.apply_async(process_func)))
 
             # Collect results, handling failures individually
@@ -122,3 +150,4 @@ def run_replay(config, is_parallel, client_class, client_script_abs, client_dir,
         failed_list = [str(p) for p in failed_periods]
         summary_msg = f"Replay completed for client {config['client_name']}. {num_success}/{total_periods} subjobs successful. Failed subjobs: {', '.join(failed_list)}"
     logging.info(summary_msg)
+    return successful_periods, failed_periods
@@ -0,0 +1,123 @@
+import copy
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import traceback
+from .arch_data_loader import ArchDataLoader
+from .replay_helper import load_client_class
+from .log_helper import init_worker_logging
+
+_SWEEP_DATA = None  # [(period_tuple, data)] loaded once by the parent, set in each pool worker
+
+# Config keys that shape the data the parent loads once; sweeping them would silently reuse the base config's data
+DATA_KEYS = ('historical_range', 'universe', 'frequency', 'calendar', 'region', 'historical_dir')
+DATASOURCE_DATA_KEYS = ('columns', 'dtypes', 'copy')
+
+def expand_grid(grid):
+    """Turn a nested grid ({'custom_client_info': {'threshold': [1, 2]}}) into a list of {dotted.path: value}."""
+    flat = {}
+    def walk(node, prefix):
+        for key, value in node.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if isinstance(value, dict):
+                walk(value, path)
+            else:
+                flat[path] = value if isinstance(value, list) else [value]
+    walk(grid, '')
+    paths = list(flat.keys())
+    return [dict(zip(paths, values)) for values in itertools.product(*(flat[p] for p in paths))]
+
+def data_param_paths(grid):
+    """Grid paths that would change the shared data (see DATA_KEYS) and so cannot be swept."""
+    paths = expand_grid(grid)[0].keys()
+    bad = []
+    for path in paths:
+        parts = path.split('.')
+        if parts[0] in DATA_KEYS:
+            bad.append(path)
+        elif parts[0] == 'datasources' and (len(parts) < 3 or parts[2] in DATASOURCE_DATA_KEYS):
+            bad.append(path)
+    return bad
+
+def apply_params(config, params):
+    config = copy.deepcopy(config)
+    for path, value in params.items():
+        node = config
+        *parents, leaf = path.split('.')
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return config
+
+def _init_sweep_worker(shared_data, config=None, worker_log_file=None):
+    global _SWEEP_DATA
+    _SWEEP_DATA = shared_data
+    if worker_log_file is not None:
+        init_worker_logging(config, worker_log_file)
+
+def run_param_set(config, client_script_abs, param_id, params, sweep_dir):
+    """Replay every shared period for one parameter set; outputs go to <sweep_dir>/param_id=<id>/."""
+    config = apply_params(config, params)
+    config['output_type'] = 'parquet'
+    config['output_dir'] = os.path.join(sweep_dir, f"param_id={param_id}")
+    client = load_client_class(client_script_abs)(config, config['client_name'])
+    failed = []
+    for period, data in _SWEEP_DATA:
+        try:
+            # Copy per parameter set: clients are free to add columns to the frames they receive
+            client.process_period(period[0], {df_type: df.copy() for df_type, df in data.items()})
+        except Exception as e:
+            failed.append(str(period))
+            logging.exception(f"Sweep param_id={param_id}: Failed to process period {period}: {e}")
+    return param_id, failed
+
+def run_sweep(config, client_script_abs, client_dir, config_name, log_dir, run_timestamp, grid, num_processes=4, timeout_seconds=1800):
+    """Load data and periods once, then replay every grid combination across a process pool."""
+    bad_paths = data_param_paths(grid)
+    if bad_paths:
+        raise ValueError(f"Sweep grid cannot vary data-loading keys (data is loaded once for all sets): {', '.join(bad_paths)}")
+    loader = ArchDataLoader(config)
+    periods = loader.get_periods()
+    shared_data = [(period, loader.load_data(*period)) for period in periods]
+    logging.info(f"Sweep: loaded data for {len(periods)} periods once")
+
+    param_sets = expand_grid(grid)
+    sweep_dir = os.path.join(client_dir, config.get('output_dir', 'outputs'), f"sweep_{config['client_name']}_{config_name}_{run_timestamp}")
+    os.makedirs(sweep_dir, exist_ok=True)
+    with open(f"{sweep_dir}/params.json", 'w') as f:
+        json.dump({param_id: params for param_id, params in enumerate(param_sets)}, f, indent=2, default=str)
+    logging.info(f"Running sweep of {len(param_sets)} parameter sets with {num_processes} processes into {sweep_dir}")
+
+    if config.get('log_mode', 'sync') == 'queue':
+        # One queued sink per worker process instead of funnelling every record through the parent
+        initargs = (shared_data, config, f"{log_dir}/sweep_{config['client_name']}_{config_name}_{run_timestamp}_{{pid}}.log")
+    else:
+        import multiprocessing_logging
+        multiprocessing_logging.install_mp_handler()
+        initargs = (shared_data,)
+    successful_sets = []
+    failed_sets = []
+    with mp.Pool(processes=num_processes, initializer=_init_sweep_worker, initargs=initargs) as pool:
+        tasks = [(param_id, pool.apply_async(run_param_set, (config, client_script_abs, param_id, params, sweep_dir)))
+                 for param_id, params in enumerate(param_sets)]
+        for param_id, res in tasks:
+            try:
+                _, failed_periods = res.get(timeout=timeout_seconds)
+                if failed_periods:
+                    failed_sets.append(param_id)
+                    logging.error(f"Sweep param_id={param_id}: {len(failed_periods)}/{len(periods)} periods failed: {', '.join(failed_periods)}")
+                else:
+                    successful_sets.append(param_id)
+            except (mp.TimeoutError, Exception) as e:
+                failed_sets.append(param_id)
+                logging.exception(f"Sweep param_id={param_id} failed (timeout or error): {e}\nTraceback: {traceback.format_exc()}")
+        pool.close()
+        pool.join()
+
+    if not failed_sets:
+        summary_msg = f"Sweep completed successfully for client {config['client_name']}. All {len(param_sets)} parameter sets successful. Outputs in {sweep_dir}"
+    else:
+        summary_msg = f"Sweep completed for client {config['client_name']}. {len(successful_sets)}/{len(param_sets)} parameter sets successful. Failed param_ids: {', '.join(map(str, failed_sets))}. Outputs in {sweep_dir}"
+    logging.info(summary_msg)
@@ -0,0 +1,126 @@
+# core/warm_daemon.py
+# Only stdlib at module level: submit_job runs in the short-lived CLI process.
+import logging
+import os
+import signal
+import sys
+
+def preload(configs=()):
+    """Import the heavy modules and warm calendar/data caches; forked jobs inherit all of it."""
+    import pandas  # noqa: F401
+    import multiprocessing_logging  # noqa: F401
+    from . import replay_helper, sweep_helper  # noqa: F401  (pulls in pandas_market_calendars, redis)
+    from .arch_data_loader import ArchDataLoader
+    from .period_helper import get_calendar
+    for config in configs:
+        config = dict(config, mode='replay')
+        get_calendar(config.get('calendar', '24/5'))
+        loader = ArchDataLoader(config)
+        loader.get_periods()
+        for ds in loader.datasources.keys():
+            try:
+                loader._get_historical_frame(ds)  # Fills the process-wide frame cache
+            except Exception as e:
+                # Same tolerance as replay itself: a datasource without a file is logged, not fatal
+                logging.error(f"Error preloading historical {ds} for region {config['region']}: {e}")
+        logging.info(f"Preloaded calendar and data for {config.get('client_name', config['region'])}")
+
+def authkey_file(socket_path):
+    # Lives next to the socket (and PID file); readable only by the daemon's user
+    return f"{os.path.splitext(socket_path)[0]}.key"
+
+def _create_authkey(socket_path):
+    path = authkey_file(socket_path)
+    authkey = os.urandom(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    os.chmod(path, 0o600)  # O_CREAT mode does not apply to an existing file
+    return authkey
+
+def _attach_submitter_output(conn):
+    """In the job child: point stdout/stderr at the submitter's terminal (fds passed over the socket)."""
+    from multiprocessing.reduction import recv_handle
+    for target in (1, 2):
+        fd = recv_handle(conn)
+        os.dup2(fd, target)
+        os.close(fd)
+
+def serve(socket_path, run_job):
+    """Accept jobs on a unix socket and run each in a forked child, replying with its exit status.
+
+    The child writes to the submitter's stdout/stderr, which submit_job passes over the socket.
+
+    The socket is created mode 0600 and connections must pass the authkey stored in authkey_file(socket_path),
+    since a job runs arbitrary client code as the daemon's user.
+    """
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Listener
+    os.makedirs(os.path.dirname(socket_path) or '.', exist_ok=True)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Left behind by a previous daemon
+    authkey = _create_authkey(socket_path)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Auto-reap finished job children
+    old_umask = os.umask(0o177)  # Socket is bound with mode 0600
+    try:
+        listener = Listener(socket_path, family='AF_UNIX', authkey=authkey)
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    with listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError, EOFError) as e:
+                logging.warning(f"Rejected warm daemon connection: {e}")
+                continue
+            try:
+                job = conn.recv()
+            except EOFError:
+                conn.close()
+                continue
+            pid = os.fork()
+            if pid == 0:
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)  # Jobs wait on their own pools/subprocesses
+                status = 1
+                try:
+                    _attach_submitter_output(conn)
+                    status = run_job(job)
+                    conn.send(status)
+                finally:
+                    for stream in (sys.stdout, sys.stderr):
+                        try:
+                            stream.flush()  # _exit does not flush Python's buffers
+                        except Exception:
+                            pass
+                    # _exit skips the inherited listener's finalizer, which would unlink the daemon's socket
+                    os._exit(status if isinstance(status, int) else 1)
+            logging.info(f"Started warm job {job['argv']} in PID {pid}")
+            conn.close()
+
+def submit_job(socket_path, job):
+    """Send a job to the warm daemon and block until it reports an exit status."""
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+    try:
+        with open(authkey_file(socket_path), 'rb') as f:
+            authkey = f.read()
+        conn = Client(socket_path, family='AF_UNIX', authkey=authkey)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return f"No warm daemon listening on {socket_path}; start one with 'arch start_daemon'"
+    except PermissionError:
+        return f"Not allowed to use the warm daemon on {socket_path} (socket and key are private to its user)"
+    except AuthenticationError:
+        return f"Warm daemon on {socket_path} rejected the key in {authkey_file(socket_path)}; restart the daemon"
+    from multiprocessing.reduction import send_handle
+    with conn:
+        conn.send(job)
+        # Hand over our stdout/stderr so the job's prints, log stream and tracebacks appear here, not on the daemon
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd in (sys.stdout.fileno(), sys.stderr.fileno()):
+            send_handle(conn, fd, None)
+        try:
+            return conn.recv()
+        except EOFError:
+            return "Warm daemon job exited without reporting a status"
@@ -0,0 +1,59 @@
+# test_distributed_replay.py
+# Runs the sample client as a distributed replay against several replay_worker processes on localhost and
+# checks it matches a sequential replay. Requires a local Redis (see test_redis_push.py for connection details).
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+import yaml
+from core.arch_data_loader import ArchDataLoader
+from core.replay_helper import load_client_class, run_replay
+
+NUM_WORKERS = 3
+IDLE_TIMEOUT = 10  # Seconds before idle workers exit on their own
+CLIENT_SCRIPT = os.path.join(ROOT, 'clients/dum_alpha/client.py')
+CONFIG_FILE = os.path.join(ROOT, 'clients/dum_alpha/configs/amer.yaml')
+
+def replay(output_dir, log_dir, is_distributed):
+    with open(CONFIG_FILE, 'r') as f:
+        config = yaml.safe_load(f)
+    # Default parquet output: distributed chunks must each write their own chunk=<id>/ partition
+    config.update({'mode': 'replay', 'output_type': 'parquet', 'output_dir': output_dir})
+    run_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return run_replay(config, False, load_client_class(CLIENT_SCRIPT), CLIENT_SCRIPT, os.path.dirname(CLIENT_SCRIPT), 'amer', log_dir,
+                      run_timestamp, timeout_seconds=60, is_distributed=is_distributed, chunk_size=1)
+
+def output_rows(output_dir):
+    rows = 0
+    for dirpath, _, names in os.walk(output_dir):
+        rows += sum(len(pd.read_parquet(os.path.join(dirpath, name), engine='fastparquet')) for name in names if name.endswith('.parquet'))
+    return rows
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(processName)s - %(message)s')
+    with tempfile.TemporaryDirectory() as tmp:
+        seq_dir, dist_dir = os.path.join(tmp, 'sequential'), os.path.join(tmp, 'distributed')
+        with open(CONFIG_FILE, 'r') as f:
+            expected_periods = len(ArchDataLoader(dict(yaml.safe_load(f), mode='replay')).get_periods())
+
+        _, seq_failed = replay(seq_dir, tmp, is_distributed=False)
+        workers = [subprocess.Popen([sys.executable, os.path.join(ROOT, 'arch.py'), 'replay_worker', '--idle_timeout', str(IDLE_TIMEOUT)], cwd=ROOT)
+                   for _ in range(NUM_WORKERS)]
+        try:
+            successful, failed = replay(dist_dir, tmp, is_distributed=True)
+        finally:
+            for worker in workers:
+                worker.wait()
+
+        assert not seq_failed, f"Sequential replay failed periods: {seq_failed}"
+        assert not failed, f"Distributed replay failed periods: {failed}"
+        assert len(successful) == expected_periods, f"Expected {expected_periods} successful periods, got {len(successful)}"
+        assert output_rows(dist_dir) == output_rows(seq_dir), f"Distributed wrote {output_rows(dist_dir)} rows, sequential {output_rows(seq_dir)}"
+    print(f"Distributed replay OK: {expected_periods} periods across {NUM_WORKERS} workers, outputs match sequential")